@@ -1,5 +1,7 @@
 # USAGE
 # python scan.py --image images/page.jpg
+# python scan.py --video 0
+# python scan.py --video tray.mp4 --output scans
 
 # import the necessary packages
 from pyimagesearch.transform import four_point_transform
@@ -8,70 +10,203 @@ import numpy as np
 import argparse
 import cv2
 import imutils
+import os
 
 # construct the argument parser and parse the arguments
 ap = argparse.ArgumentParser()
-ap.add_argument("-i", "--image", required = True,
+group = ap.add_mutually_exclusive_group(required = True)
+group.add_argument("-i", "--image",
 	help = "Path to the image to be scanned")
+group.add_argument("-v", "--video",
+	help = "Path to a video file or index of a webcam to scan from")
+ap.add_argument("-s", "--stable", type = int, default = 15,
+	help = "number of frames the page must stay still before it is scanned")
+ap.add_argument("-o", "--output", default = "",
+	help = "directory to write the scans from the video to (Optional)")
 args = vars(ap.parse_args())
 
-# load the image and compute the ratio of the old height
-# to the new height, clone it, and resize it
-image = cv2.imread(args["image"])
-ratio = image.shape[0] / 500.0
-orig = image.copy()
-image = imutils.resize(image, height = 500)
-
-# convert the image to grayscale, blur it, and find edges
-# in the image
-gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-gray = cv2.GaussianBlur(gray, (5, 5), 0)
-edged = cv2.Canny(gray, 75, 200)
-
-# show the original image and the edge detected image
-print("STEP 1: Edge Detection")
-cv2.imshow("Image", image)
-cv2.imshow("Edged", edged)
-cv2.waitKey(0)
-cv2.destroyAllWindows()
-
-# find the contours in the edged image, keeping only the
-# largest ones, and initialize the screen contour
-cnts = cv2.findContours(edged.copy(), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-cnts = cnts[0] if imutils.is_cv2() else cnts[1]
-cnts = sorted(cnts, key = cv2.contourArea, reverse = True)[:5]
-
-# loop over the contours
-for c in cnts:
-	# approximate the contour
-	peri = cv2.arcLength(c, True)
-	approx = cv2.approxPolyDP(c, 0.02 * peri, True)
-
-	# if our approximated contour has four points, then we
-	# can assume that we have found our screen
-	if len(approx) == 4:
-		screenCnt = approx
-		break
-
-# show the contour (outline) of the piece of paper
-print("STEP 2: Find contours of paper")
-cv2.drawContours(image, [screenCnt], -1, (0, 255, 0), 2)
-cv2.imshow("Outline", image)
-cv2.waitKey(0)
-cv2.destroyAllWindows()
-
-# apply the four point transform to obtain a top-down
-# view of the original image
-warped = four_point_transform(orig, screenCnt.reshape(4, 2) * ratio)
-
-# convert the warped image to grayscale, then threshold it
-# to give it that 'black and white' paper effect
-warped = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
-T = threshold_local(warped, 11, offset = 10, method = "gaussian")
-warped = (warped > T).astype("uint8") * 255
-
-# show the original and scanned images
-print("STEP 3: Apply perspective transform")
-cv2.imshow("Original", imutils.resize(orig, height = 650))
-cv2.imshow("Scanned", imutils.resize(warped, height = 650))
-cv2.waitKey(0)
\ No newline at end of file
+if args["stable"] < 1:
+	ap.error("--stable must be at least 1")
+
+# in video mode a corner may drift this many pixels (in the 500px high
+# frame) from where it was when the page came to rest and still count
+# as "still"
+STABLE_MOTION = 1.5
+
+def find_document(edged):
+	# find the contours in the edged image, keeping only the
+	# largest ones, and initialize the screen contour
+	cnts = cv2.findContours(edged.copy(), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+	cnts = imutils.grab_contours(cnts)
+	cnts = sorted(cnts, key = cv2.contourArea, reverse = True)[:5]
+
+	# loop over the contours
+	for c in cnts:
+		# approximate the contour
+		peri = cv2.arcLength(c, True)
+		approx = cv2.approxPolyDP(c, 0.02 * peri, True)
+
+		# if our approximated contour has four points, then we
+		# can assume that we have found our screen
+		if len(approx) == 4:
+			return approx
+
+	# no page in this image
+	return None
+
+def scan_document(orig, pts):
+	# apply the four point transform to obtain a top-down
+	# view of the original image
+	warped = four_point_transform(orig, pts)
+
+	# convert the warped image to grayscale, then threshold it
+	# to give it that 'black and white' paper effect
+	warped = cv2.cvtColor(warped, cv2.COLOR_BGR2GRAY)
+	T = threshold_local(warped, 11, offset = 10, method = "gaussian")
+	return (warped > T).astype("uint8") * 255
+
+def valid_quad(pts, shape):
+	# a page is a convex quadrilateral covering a reasonable part of
+	# the frame, anything smaller is clutter on the tray
+	if not cv2.isContourConvex(pts):
+		return False
+	return cv2.contourArea(pts) >= 0.1 * shape[0] * shape[1]
+
+def track_document(prevGray, gray, quad):
+	# follow the four corners from the previous frame into this one
+	# with pyramidal Lucas-Kanade optical flow, the window around each
+	# corner is enough to lock onto the page edges meeting there
+	pts, status, _ = cv2.calcOpticalFlowPyrLK(prevGray, gray,
+		quad.reshape(4, 1, 2).astype("float32"), None,
+		winSize = (21, 21), maxLevel = 3)
+
+	# the page is lost if any corner could not be tracked or the four
+	# corners no longer form a page
+	pts = pts.reshape(4, 2)
+	if not status.all() or not valid_quad(pts, gray.shape):
+		return None
+
+	return pts
+
+def scan_video(src):
+	# the (expensive) contour search only runs while we have no page,
+	# once found the corners are tracked frame-to-frame and the full
+	# resolution scan is done once the page has been still for
+	# --stable frames
+	vs = cv2.VideoCapture(int(src) if src.isdigit() else src)
+	quad = None
+	anchor = None
+	prevGray = None
+	still = 0
+	scans = 0
+
+	while True:
+		(grabbed, frame) = vs.read()
+		if not grabbed:
+			break
+
+		# same resizing as for a still image, but keep the
+		# full-resolution frame around for the scan itself
+		ratio = frame.shape[0] / 500.0
+		image = imutils.resize(frame, height = 500)
+		gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+		gray = cv2.GaussianBlur(gray, (5, 5), 0)
+
+		if quad is None:
+			# no page yet (or we lost it), search the whole frame
+			edged = cv2.Canny(gray, 75, 200)
+			screenCnt = find_document(edged)
+			if screenCnt is not None:
+				pts = screenCnt.reshape(4, 2).astype("float32")
+				if valid_quad(pts, gray.shape):
+					quad = pts
+					anchor = pts
+			still = 0
+		else:
+			# track the corners, and count how long they stay within
+			# STABLE_MOTION of where they were when the page stopped,
+			# so a page sliding slowly never counts as still
+			quad = track_document(prevGray, gray, quad)
+			if quad is None:
+				still = 0
+			elif np.abs(quad - anchor).max() > STABLE_MOTION:
+				anchor = quad
+				still = 0
+			else:
+				still += 1
+
+		prevGray = gray
+
+		# scan exactly once per still period, the page has to
+		# move again before it is scanned a second time
+		if quad is not None and still == args["stable"]:
+			warped = scan_document(frame, quad * ratio)
+			cv2.imshow("Scanned", imutils.resize(warped, height = 650))
+			if args["output"] != "":
+				path = os.path.join(args["output"], "scan_{:04d}.png".format(scans))
+				cv2.imwrite(path, warped)
+				print("[INFO] saved {}".format(path))
+			scans += 1
+
+		# show the outline of the page, green once it has been scanned
+		if quad is not None:
+			color = (0, 255, 0) if still >= args["stable"] else (0, 255, 255)
+			cv2.drawContours(image, [quad.astype("int32")], -1, color, 2)
+		cv2.imshow("Outline", image)
+
+		# if q was pressed, break from loop
+		if cv2.waitKey(1) & 0xFF == ord("q"):
+			break
+
+	# cleanup
+	vs.release()
+	cv2.destroyAllWindows()
+
+if args["video"] is not None:
+	if args["output"] != "" and not os.path.exists(args["output"]):
+		os.makedirs(args["output"])
+	scan_video(args["video"])
+
+else:
+	# load the image and compute the ratio of the old height
+	# to the new height, clone it, and resize it
+	image = cv2.imread(args["image"])
+	ratio = image.shape[0] / 500.0
+	orig = image.copy()
+	image = imutils.resize(image, height = 500)
+
+	# convert the image to grayscale, blur it, and find edges
+	# in the image
+	gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+	gray = cv2.GaussianBlur(gray, (5, 5), 0)
+	edged = cv2.Canny(gray, 75, 200)
+
+	# show the original image and the edge detected image
+	print("STEP 1: Edge Detection")
+	cv2.imshow("Image", image)
+	cv2.imshow("Edged", edged)
+	cv2.waitKey(0)
+	cv2.destroyAllWindows()
+
+	# find the largest four point contour, i.e. the piece of paper
+	screenCnt = find_document(edged)
+	if screenCnt is None:
+		raise SystemExit("[ERROR] no page (four point contour) found in {}".format(
+			args["image"]))
+
+	# show the contour (outline) of the piece of paper
+	print("STEP 2: Find contours of paper")
+	cv2.drawContours(image, [screenCnt], -1, (0, 255, 0), 2)
+	cv2.imshow("Outline", image)
+	cv2.waitKey(0)
+	cv2.destroyAllWindows()
+
+	# warp the paper to a top-down view of the original image
+	# and binarize it
+	warped = scan_document(orig, screenCnt.reshape(4, 2) * ratio)
+
+	# show the original and scanned images
+	print("STEP 3: Apply perspective transform")
+	cv2.imshow("Original", imutils.resize(orig, height = 650))
+	cv2.imshow("Scanned", imutils.resize(warped, height = 650))
+	cv2.waitKey(0)
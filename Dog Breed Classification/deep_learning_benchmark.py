@@ -0,0 +1,262 @@
+# USAGE
+# python deep_learning_benchmark.py --prototxt bvlc_googlenet.prototxt --model bvlc_googlenet.caffemodel --labels synset_words.txt
+# python deep_learning_benchmark.py --prototxt bvlc_googlenet.prototxt --model bvlc_googlenet.caffemodel --labels synset_words.txt --onnx googlenet.onnx --calib calib_images --threads 4
+
+# This script compares the different ways we can run GoogLeNet on the CPU:
+# (1) the Caffe model through OpenCV's dnn module (FP32, the reference)
+# (2) the same model with an explicit backend / target (e.g. OpenVINO or FP16)
+# (3) an ONNX export of GoogLeNet through OpenCV and through ONNX Runtime
+# (4) an INT8-quantized version of the ONNX model through ONNX Runtime
+# For every configuration we check the top-5 predictions against the FP32
+# reference on the bundled test images and measure latency / throughput.
+
+import numpy as np
+import cv2
+import time
+import argparse
+import os
+from dnn_backends import BACKENDS, TARGETS
+
+# ONNX Runtime is optional, without it we only benchmark the OpenCV configurations
+try:
+    import onnxruntime as ort
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+        QuantType, quantize_static)
+except ImportError:
+    ort = None
+
+# Construct the command line arguments
+ap = argparse.ArgumentParser()
+ap.add_argument('-p','--prototxt', required=True, help="Path to Caffe deploy prototxt file")
+ap.add_argument('-m','--model', required=True, help="Path to the pre-trained output model")
+ap.add_argument('-l','--labels', required=True, help="Path to imageNet labels(i.e,syn-nets)")
+ap.add_argument('-d','--images', default="images", help="directory with the test images")
+ap.add_argument('-o','--onnx', default="", help="Path to GoogLeNet exported to ONNX (Optional)")
+ap.add_argument('-q','--int8', default="", help="Path for the INT8-quantized ONNX model (created if missing)")
+ap.add_argument('-c','--calib', default="", help="directory with the images used to calibrate the INT8 model")
+ap.add_argument('-b','--backend', default="default", choices=sorted(BACKENDS), help="OpenCV DNN backend for the extra configuration")
+ap.add_argument('-t','--target', default="cpu", choices=sorted(TARGETS), help="OpenCV DNN target for the extra configuration")
+ap.add_argument('-n','--threads', type=int, default=0, help="number of CPU threads to use (0 = library default)")
+ap.add_argument('-r','--runs', type=int, default=50, help="number of timed forward passes per image")
+ap.add_argument('-s','--batch', type=int, default=8, help="number of images per forward pass for the throughput run")
+args = vars(ap.parse_args())
+
+if args["runs"] < 1 or args["batch"] < 1:
+    ap.error("--runs and --batch must be at least 1")
+if args["calib"] != "" and not os.path.isdir(args["calib"]):
+    ap.error("--calib {} is not a directory".format(args["calib"]))
+
+# --onnx : OpenCV can read Caffe models but cannot write ONNX, so the export is done
+#          once, offline, with caffe2onnx (see the Readme):
+#          python -m caffe2onnx.convert --prototxt bvlc_googlenet.prototxt --caffemodel bvlc_googlenet.caffemodel --onnx googlenet.onnx
+#          The export keeps the Caffe input (1x3x224x224, BGR, mean-subtracted). The script
+#          checks the model takes a Nx3x224x224 input and stops if its predictions do not
+#          match the Caffe model, which usually means the export expects other pre-processing.
+# --int8 : where the quantized model is stored, defaults to <onnx>-int8-<calib dir>.onnx
+#          (<onnx>-int8-testimages.onnx without --calib) so the two are never mixed up
+# --calib : images to pick the INT8 scales from. They must not be the test images,
+#           otherwise the INT8 accuracy numbers are measured on its own calibration data.
+
+# the bundled test images the accuracy check runs on
+IMAGES = ["jemma.png", "eagle.png", "traffic_light.png", "vending_machine.png"]
+
+# load the class labels from disk
+rows = open(args["labels"]).read().strip().split("\n")
+classes = [r[r.find(" ")+1:].split(",")[0] for r in rows]
+
+
+def load_blob(path):
+    # pre-process an image exactly like deep_learning_practice.py does:
+    # resize to 224x224 and subtract the ImageNet mean (104, 117, 123)
+    image = cv2.imread(path)
+    if image is None:
+        return None
+    return cv2.dnn.blobFromImage(image, 1, (224, 224), (104, 117, 123))
+
+
+blobs = {}
+for name in IMAGES:
+    path = os.path.join(args["images"], name)
+    blobs[name] = load_blob(path)
+    if blobs[name] is None:
+        raise SystemExit("[ERROR] cannot read test image {}, point --images to the "
+            "directory with the bundled images".format(path))
+
+# for the throughput run we stack the test images (repeated as needed)
+# into a single blob of --batch images
+batch = np.concatenate([blobs[IMAGES[i % len(IMAGES)]] for i in range(args["batch"])])
+
+# OpenCV is pinned with setNumThreads here, ONNX Runtime through the
+# intra_op_num_threads of its session options (see ort_runner)
+if args["threads"] > 0:
+    cv2.setNumThreads(args["threads"])
+
+
+class ImageDataReader(CalibrationDataReader if ort is not None else object):
+    # feeds blobs to ONNX Runtime's static quantizer so it can pick the
+    # INT8 scale of every activation
+    def __init__(self, input_name, data):
+        self.data = iter([{input_name: b} for b in data])
+
+    def get_next(self):
+        return next(self.data, None)
+
+
+def opencv_runner(net, backend, target):
+    # wrap an OpenCV network in a function that takes a blob and returns
+    # the class probabilities, one row per image
+    net.setPreferableBackend(backend)
+    net.setPreferableTarget(target)
+
+    def run(blob):
+        net.setInput(blob)
+        return net.forward().reshape(blob.shape[0], -1)
+
+    return run
+
+
+def ort_runner(path):
+    # same as opencv_runner, but for an ONNX Runtime session
+    opts = ort.SessionOptions()
+    if args["threads"] > 0:
+        opts.intra_op_num_threads = args["threads"]
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess = ort.InferenceSession(path, opts, providers=["CPUExecutionProvider"])
+    input_name = sess.get_inputs()[0].name
+
+    def run(blob):
+        return sess.run(None, {input_name: blob})[0].reshape(blob.shape[0], -1)
+
+    return run
+
+
+def check_onnx(path):
+    # make sure the exported model takes the same Nx3x224x224 blob as the
+    # Caffe model and return whether the shape could be checked and the
+    # batch size (None if it is dynamic)
+    if ort is None:
+        print("[INFO] onnxruntime not installed, cannot check the ONNX input shape")
+        return (False, None)
+    shape = ort.InferenceSession(path,
+        providers=["CPUExecutionProvider"]).get_inputs()[0].shape
+    if len(shape) != 4 or list(shape[1:]) != [3, 224, 224]:
+        raise SystemExit("[ERROR] {} expects an input of shape {}, not Nx3x224x224".format(
+            path, shape))
+    return (True, shape[0] if isinstance(shape[0], int) else None)
+
+
+def benchmark(label, run, max_batch=None, reference=None, checked=True):
+    # latency: time every forward pass of a single image, the first pass is
+    # excluded because it includes the lazy allocation of the network buffers
+    preds = {}
+    times = []
+    for (name, blob) in blobs.items():
+        preds[name] = run(blob)[0]
+        for _ in range(args["runs"]):
+            start = time.perf_counter()
+            run(blob)
+            times.append(time.perf_counter() - start)
+    times = np.array(times) * 1000
+
+    print("[INFO] {}".format(label))
+    print("    latency: mean {:.2f} ms, median {:.2f} ms, p95 {:.2f} ms".format(
+        times.mean(), np.median(times), np.percentile(times, 95)))
+
+    # throughput: wall time of --runs forward passes of a --batch images blob
+    if not checked:
+        print("    throughput: n/a, the batch size of the model could not be checked")
+    elif max_batch is not None and args["batch"] > max_batch:
+        print("    throughput: n/a, the model has a fixed batch size of {}".format(max_batch))
+    else:
+        run(batch)
+        start = time.perf_counter()
+        for _ in range(args["runs"]):
+            run(batch)
+        elapsed = time.perf_counter() - start
+        print("    throughput: {:.1f} images/sec (batch of {})".format(
+            args["batch"] * args["runs"] / elapsed, args["batch"]))
+
+    if reference is None:
+        return (preds, None)
+
+    # compare the top-5 with the FP32 reference, highest probability first
+    matches = 0
+    for name in IMAGES:
+        idxs = np.argsort(preds[name])[::-1][:5]
+        ref = np.argsort(reference[name])[::-1][:5]
+        overlap = len(set(idxs) & set(ref))
+        diff = np.abs(preds[name] - reference[name]).max()
+        matches += idxs[0] == ref[0]
+        print("    {}: top-1 {} ({}), top-5 overlap {}/5, max prob diff {:.4f}".format(
+            name, classes[idxs[0]], "match" if idxs[0] == ref[0] else "MISMATCH",
+            overlap, diff))
+
+    return (preds, matches)
+
+
+# the FP32 reference, pinned to OpenCV's own backend on the CPU
+print("[INFO] loading model..")
+(reference, _) = benchmark("caffe fp32 (reference)", opencv_runner(
+    cv2.dnn.readNetFromCaffe(args["prototxt"], args["model"]),
+    cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU))
+
+# "default" resolves to the OpenCV backend unless OpenCV was built with
+# the Inference Engine, so on the CPU this would only repeat the reference
+if args["backend"] in ("default", "opencv") and args["target"] == "cpu":
+    print("[INFO] caffe {}/{} is the reference configuration, skipping it".format(
+        args["backend"], args["target"]))
+else:
+    benchmark("caffe {}/{}".format(args["backend"], args["target"]), opencv_runner(
+        cv2.dnn.readNetFromCaffe(args["prototxt"], args["model"]),
+        BACKENDS[args["backend"]], TARGETS[args["target"]]), reference=reference)
+
+if args["onnx"] != "":
+    (checked, max_batch) = check_onnx(args["onnx"])
+    runners = [("onnx fp32 (opencv)", opencv_runner(cv2.dnn.readNetFromONNX(args["onnx"]),
+        BACKENDS[args["backend"]], TARGETS[args["target"]]))]
+    if ort is None:
+        print("[INFO] onnxruntime not installed, skipping the ONNX Runtime configurations")
+    else:
+        runners.append(("onnx fp32 (onnxruntime)", ort_runner(args["onnx"])))
+
+    # an export that disagrees with Caffe on every image is a broken export
+    # (e.g. RGB input or 0-1 scaling), not quantization or rounding error
+    for (label, run) in runners:
+        (_, matches) = benchmark(label, run, max_batch, reference, checked)
+        if matches == 0:
+            raise SystemExit("[ERROR] {}: top-1 differs from the Caffe model on every test "
+                "image, check that the ONNX export is BVLC GoogLeNet with BGR, "
+                "mean-subtracted input".format(label))
+
+    if ort is not None:
+        # quantize the weights and activations to INT8 once, then reuse the file,
+        # the default name records what the model was calibrated on
+        if args["calib"] != "":
+            source = os.path.basename(os.path.normpath(args["calib"]))
+        else:
+            source = "testimages"
+            print("[WARNING] no --calib directory, calibrating on the test images: "
+                "the INT8 accuracy figures will be optimistic")
+        int8 = args["int8"] or "{}-int8-{}.onnx".format(os.path.splitext(args["onnx"])[0], source)
+
+        if os.path.exists(int8):
+            print("[INFO] reusing existing INT8 model {} (delete it to recalibrate)".format(int8))
+        else:
+            if args["calib"] != "":
+                calib = [load_blob(os.path.join(args["calib"], f))
+                    for f in sorted(os.listdir(args["calib"]))]
+                calib = [b for b in calib if b is not None]
+                if len(calib) == 0:
+                    raise SystemExit("[ERROR] no readable images in --calib {}".format(
+                        args["calib"]))
+            else:
+                calib = list(blobs.values())
+
+            print("[INFO] quantizing {} to INT8 with {} calibration images..".format(
+                args["onnx"], len(calib)))
+            input_name = ort.InferenceSession(args["onnx"],
+                providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            quantize_static(args["onnx"], int8, ImageDataReader(input_name, calib),
+                quant_format=QuantFormat.QDQ, per_channel=True,
+                activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+        benchmark("onnx int8 (onnxruntime)", ort_runner(int8), max_batch, reference)
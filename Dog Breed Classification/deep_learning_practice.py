@@ -1,10 +1,12 @@
 # USAGE
 # python deep_learning_with_opencv.py --image images/jemma.png --prototxt bvlc_googlenet.prototxt --model bvlc_googlenet.caffemodel --labels synset_words.txt
+# python deep_learning_with_opencv.py --image images/jemma.png --prototxt bvlc_googlenet.prototxt --model bvlc_googlenet.caffemodel --labels synset_words.txt --backend opencv --target cpu --threads 4
 
 import numpy as np
 import cv2
 import time
 import argparse
+from dnn_backends import BACKENDS, TARGETS
 
 # Construct the commadn line arguments
 ap = argparse.ArgumentParser()
@@ -12,12 +14,23 @@ ap.add_argument('-i','--image', required=True, help="path to input image")
 ap.add_argument('-p','--prototxt', required=True, help="Path to Caffe deploy prototxt file")
 ap.add_argument('-m','--model', required=True, help="Path to the pre-trained output model")
 ap.add_argument('-l','--labels', required=True, help="Path to imageNet labels(i.e,syn-nets)")
+ap.add_argument('-b','--backend', default="default", choices=sorted(BACKENDS), help="OpenCV DNN backend to run the network on")
+ap.add_argument('-t','--target', default="cpu", choices=sorted(TARGETS), help="OpenCV DNN target device")
+ap.add_argument('-n','--threads', type=int, default=0, help="number of CPU threads OpenCV may use (0 = OpenCV default)")
 args = vars(ap.parse_args())
 
 # --image : The path to the input image.
 # --prototxt : The path to the Caffe “deploy” prototxt file.
 # --model : The pre-trained Caffe model (i.e,. the network weights themselves).
 # --labels : The path to ImageNet labels (i.e., “syn-sets”).
+# --backend : The DNN backend, "opencv" is the built-in implementation and "openvino" is Intel's Inference Engine.
+# --target : The device the backend runs on; "opencl_fp16" runs the network in half precision.
+# --threads : The number of threads OpenCV is allowed to use for the forward pass.
+
+# by default OpenCV uses every core it can find, pinning the thread count
+# keeps timings comparable between machines
+if args["threads"] > 0:
+    cv2.setNumThreads(args["threads"])
 
 # Let’s load the input image and class labels:
 
@@ -46,6 +59,8 @@ blob = cv2.dnn.blobFromImage(image,1,(224,224),(104,117,123))
 # load our serialized model from disk
 print("[INFO] loading model..")
 net = cv2.dnn.readNetFromCaffe(args["prototxt"], args["model"])
+net.setPreferableBackend(BACKENDS[args["backend"]])
+net.setPreferableTarget(TARGETS[args["target"]])
 
 # Now let’s complete a forward pass through the network with blob  as the input:
 
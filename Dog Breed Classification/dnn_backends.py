@@ -0,0 +1,18 @@
+# OpenCV DNN backends and targets that can be picked from the command line,
+# shared by deep_learning_practice.py and deep_learning_benchmark.py
+
+import cv2
+
+# "opencv" is the built-in implementation, "openvino" is Intel's Inference Engine
+BACKENDS = {
+    "default": cv2.dnn.DNN_BACKEND_DEFAULT,
+    "opencv": cv2.dnn.DNN_BACKEND_OPENCV,
+    "openvino": cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+}
+
+# "opencl_fp16" runs the network in half precision
+TARGETS = {
+    "cpu": cv2.dnn.DNN_TARGET_CPU,
+    "opencl": cv2.dnn.DNN_TARGET_OPENCL,
+    "opencl_fp16": cv2.dnn.DNN_TARGET_OPENCL_FP16,
+}